@@ -1,12 +1,97 @@
 import tkinter as tk
 import cv2
+import numpy as np
 from PIL import Image, ImageTk
 from ultralytics import YOLO
 import sqlite3
 import time
-import datetime
+import queue
+import threading
+import collections
+import atexit
+import logging
+from logging.handlers import QueueHandler, QueueListener
 import sys
 import os # To check if DB file exists
+import torch
+
+# --- Logging ---
+LOG_FILE = 'focuspal.log'
+log = logging.getLogger('focuspal')
+
+# --- Model Files ---
+# The .engine/.onnx files are produced once by export_model.py
+MODEL_WEIGHTS = 'yolov8n.pt'    # PyTorch weights (FP32 eager fallback)
+MODEL_ENGINE = 'yolov8n.engine' # TensorRT FP16 engine, used when an NVIDIA GPU is present
+MODEL_ONNX = 'yolov8n.onnx'     # ONNX Runtime model, used when no NVIDIA GPU is present
+MODEL_ONNX_INT8 = 'yolov8n_int8.onnx' # INT8 quantized ONNX model, preferred on CPU-only machines
+# Square input size fed to the model (export_model.py builds the exported models for it)
+# 320 has ~4x fewer FLOPs than 640 and still finds a person sitting in front of a webcam reliably
+INFER_IMGSZ = 320
+
+# --- Camera ---
+# Frames are shrunk to INFER_IMGSZ for the model anyway, so capturing above 640x480 only adds preprocessing work
+CAMERA_WIDTH = 640
+CAMERA_HEIGHT = 480
+CAPTURE_STOP_TIMEOUT_S = 1.0 # How long stopping waits for the capture thread's current camera read
+# Platform-native capture backend; automatic selection can pick a slow one (e.g. MSMF on Windows)
+if sys.platform == 'win32':
+    CAMERA_BACKEND = cv2.CAP_DSHOW
+elif sys.platform == 'darwin':
+    CAMERA_BACKEND = cv2.CAP_AVFOUNDATION
+else:
+    CAMERA_BACKEND = cv2.CAP_V4L2
+
+# --- Frame Loop ---
+ACTIVE_FRAME_DELAY_MS = 15 # Frame loop delay while someone is (or was recently) present (polls faster than the camera delivers)
+IDLE_FRAME_DELAY_MS = 200 # Frame loop and capture delay during long absences (~5 FPS)
+
+# --- Detection Batching ---
+# While detection runs every second, a few decimated frames from the interval are inferred together with
+# the latest one; a person seen in any of them counts, which debounces single-frame misses
+DETECTION_BATCH_SIZE = 4 # Maximum frames per inference batch (exported models are built for this batch size)
+BATCH_FRAME_STRIDE = 8   # Keep every Nth displayed frame for the next batch
+INFER_STOP_TIMEOUT_S = 2.0 # How long stopping waits for the inference worker to finish its current batch
+
+# --- Static Scene Gate ---
+SCENE_THUMB_SIZE = (32, 32)  # Grayscale thumbnail used to detect whether the scene changed
+SCENE_CHANGE_THRESHOLD = 3.0 # Mean absolute thumbnail difference (0-255) below which the scene counts as unchanged
+SCENE_GATE_MIN_NEGATIVES = 3 # Consecutive "no person" inferences required before the gate may skip YOLO
+SCENE_GATE_MAX_AGE_S = 30.0  # A real inference runs at least this often even if the scene looks unchanged
+
+# --- Database ---
+INSERT_SESSION_SQL = ("INSERT INTO presence (start_time, end_time, duration, start_epoch, end_epoch, duration_ms) "
+                      "VALUES (?, ?, ?, ?, ?, ?)")
+# Integer columns added after the original schema; databases created by older versions are migrated in connect_db
+EPOCH_COLUMNS = ('start_epoch', 'end_epoch', 'duration_ms')
+SESSION_FLUSH_EVERY = 5 # Finished sessions are written in one transaction once this many are pending
+SESSION_FLUSH_MAX_AGE_MS = 60000 # ...or once the oldest pending session has waited this long, whichever comes first
+
+def setup_logging():
+    # Log calls only enqueue the record; the listener thread does the file/console I/O,
+    # so logging from the Tk loop never blocks on a write
+    log_queue = queue.Queue()
+    log.setLevel(logging.INFO)
+    log.addHandler(QueueHandler(log_queue))
+
+    formatter = logging.Formatter("%(asctime)s %(levelname)s %(message)s")
+    file_handler = logging.FileHandler(LOG_FILE)
+    file_handler.setFormatter(formatter)
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(formatter)
+
+    listener = QueueListener(log_queue, file_handler, console_handler)
+    listener.start()
+    atexit.register(listener.stop) # Flush queued records on exit (on_closing ends with sys.exit())
+    return listener
+
+def onnxruntime_has_cuda():
+    # True if the installed ONNX Runtime build ships the CUDA execution provider (onnxruntime-gpu)
+    try:
+        import onnxruntime
+    except ImportError:
+        return False
+    return 'CUDAExecutionProvider' in onnxruntime.get_available_providers()
 
 class PresenceTrackerApp:
     def __init__(self, root):
@@ -17,11 +102,36 @@ class PresenceTrackerApp:
         # --- State Variables ---
         self.running = False # Overall application state (Started/Stopped)
         self.paused = False  # Application state (Paused/Not Paused)
+        self.frame_after_id = None # Tk after() id of the next scheduled update_frame call
 
         self.camera = None   # OpenCV VideoCapture object
         self.model = None    # YOLOv8 model object
+        self.predict_kwargs = {} # Extra model.predict() arguments for the loaded model's backend
         self.conn = None     # SQLite database connection
         self.cursor = None   # SQLite database cursor
+        self.pending_sessions = [] # Finished sessions not yet written to the database
+        self.flush_timer = None    # Tk after() id of the pending age-based flush, if one is scheduled
+
+        # --- Inference Worker ---
+        # YOLO runs in a background thread so detection latency never stalls the Tk loop
+        self.infer_q = None      # Single-slot queue of frame batches waiting for inference (latest batch wins)
+        self.result_q = None     # Single-slot queue of (person_detected, error) results from the worker
+        self.infer_thread = None # Background inference thread
+        # When the loaded model runs on the GPU, frames are converted to model input there instead of by Ultralytics
+        # on the CPU (set by load_model from the model actually chosen)
+        self.gpu_preprocess = False
+        self.infer_buf = None # Preallocated (DETECTION_BATCH_SIZE, INFER_IMGSZ, INFER_IMGSZ, 3) BGR buffer frames are resized into
+        # Decimated frames collected since the last detection run (the current frame completes the batch)
+        self.det_batch = collections.deque(maxlen=DETECTION_BATCH_SIZE - 1)
+        self.frames_since_batch_add = 0 # Displayed frames since the last one was added to det_batch
+
+        # --- Capture Worker ---
+        # camera.read() runs in a background thread so camera I/O hiccups never block the Tk loop
+        self.latest_frame = collections.deque(maxlen=1) # Most recent captured frame (older frames are dropped)
+        self.capture_thread = None  # Background capture thread
+        # Per-run events handed to the capture thread, so a stalled thread from a previous run cannot affect a new one
+        self.capture_stop = threading.Event()   # Set by stop_capture_thread to end the thread
+        self.capture_failed = threading.Event() # Set by the capture thread when the camera stops delivering frames
 
         # --- Session Tracking Variables ---
         self.session_active = False  # True if a person session is currently ongoing
@@ -36,8 +146,17 @@ class PresenceTrackerApp:
         self.absence_start_time = None # time.time() timestamp when absence was first detected
         self.absence_threshold = 3.0   # Seconds of consecutive absence to end a session
 
+        # --- Static Scene Gate ---
+        # While nobody is seen and the scene does not change, the previous verdict is reused instead of running YOLO
+        # Several misses in a row are required and a real inference is still forced periodically, so a single
+        # miss on someone sitting still cannot lock the tracker into "absent"
+        self.negative_streak = 0  # Consecutive successful inferences that found no person
+        self.prev_thumb = None    # Thumbnail of the last frame sent for inference
+        self.prev_thumb_time = 0  # time.time() timestamp when that frame was sent
+
         # --- Daily Total Time ---
         self.total_time_today = 0 # Load from DB on startup and update when sessions are saved
+        self.total_time_date = None # "YYYY-MM-DD" date the cached total_time_today belongs to
 
         # --- GUI Elements ---
         self.camera_label = None
@@ -47,6 +166,11 @@ class PresenceTrackerApp:
         self.start_button = None
         self.pause_resume_button = None
         self.stop_button = None
+        self.frame_image = None # Persistent Tk image the webcam feed is pasted into
+        self.frame_size = None  # (width, height) the persistent image was allocated for
+        # Whole seconds currently shown by the time labels, so they are only reconfigured when the text changes
+        self.last_session_label_sec = -1
+        self.last_total_label_sec = -1
 
         # --- Initialize ---
         self.connect_db() # Connect to DB first to load initial total time
@@ -61,70 +185,169 @@ class PresenceTrackerApp:
         try:
             self.conn = sqlite3.connect('presence.db')
             self.cursor = self.conn.cursor()
+            # WAL journaling: commits append to the log instead of syncing the whole database,
+            # and the dashboard can read while the tracker writes
+            self.cursor.execute("PRAGMA journal_mode=WAL")
+            self.cursor.execute("PRAGMA synchronous=NORMAL") # Safe with WAL; fsync only at checkpoints
+            self.cursor.execute("PRAGMA temp_store=MEMORY")
+            self.cursor.execute("PRAGMA cache_size=-8000")   # ~8 MB page cache
             self.cursor.execute('''
                 CREATE TABLE IF NOT EXISTS presence (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     start_time TEXT,
                     end_time TEXT,
-                    duration REAL
+                    duration REAL,
+                    start_epoch INTEGER,
+                    end_epoch INTEGER,
+                    duration_ms INTEGER
                 )
             ''')
+            self.migrate_epoch_columns()
+            # start_time is stored as "YYYY-MM-DD HH:MM:SS", so date range queries on it can use this index
+            self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_presence_start ON presence(start_time)")
+            # Today's total is an integer range scan on this index
+            self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_presence_start_epoch ON presence(start_epoch)")
+            self.create_daily_totals()
             self.conn.commit()
             if not db_exists:
-                print("Database 'presence.db' created and connected successfully.")
+                log.info("Database 'presence.db' created and connected successfully.")
             else:
-                print("Database 'presence.db' connected successfully.")
+                log.info("Database 'presence.db' connected successfully.")
         except sqlite3.Error as e:
-            print(f"Database error during connection or table creation: {e}")
+            log.error(f"Database error during connection or table creation: {e}")
             self.conn = None
             self.cursor = None
             # Indicate DB connection failed in GUI? Or disable DB related features?
-            # For now, just print error.
+            # For now, just log the error.
+
+    def migrate_epoch_columns(self):
+        # Adds the integer epoch/millisecond columns to databases created before they existed
+        # and fills them in from the text timestamps (stored in local time, hence the 'utc' modifier)
+        self.cursor.execute("PRAGMA table_info(presence)")
+        existing_columns = {row[1] for row in self.cursor.fetchall()}
+        missing_columns = [column for column in EPOCH_COLUMNS if column not in existing_columns]
+        if not missing_columns:
+            return
+        for column in missing_columns:
+            self.cursor.execute(f"ALTER TABLE presence ADD COLUMN {column} INTEGER")
+        self.cursor.execute('''
+            UPDATE presence SET
+                start_epoch = CAST(strftime('%s', start_time, 'utc') AS INTEGER),
+                end_epoch = CAST(strftime('%s', end_time, 'utc') AS INTEGER),
+                duration_ms = CAST(ROUND(duration * 1000) AS INTEGER)
+            WHERE start_epoch IS NULL
+        ''')
+        log.info(f"Database migrated: added columns {', '.join(missing_columns)}.")
+
+    def create_daily_totals(self):
+        # Per-day running totals kept by a trigger, so the dashboard reads today's total as one row
+        # instead of summing today's sessions. Sessions are only ever inserted, so the trigger is enough
+        self.cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='daily_totals'")
+        if self.cursor.fetchone() is None:
+            self.cursor.execute('''
+                CREATE TABLE daily_totals (
+                    date TEXT PRIMARY KEY,
+                    duration REAL NOT NULL DEFAULT 0
+                )
+            ''')
+            # Backfill from sessions logged before the table existed
+            self.cursor.execute('''
+                INSERT INTO daily_totals (date, duration)
+                SELECT DATE(start_time), SUM(duration) FROM presence GROUP BY DATE(start_time)
+            ''')
+            log.info("Database migrated: added daily_totals table.")
+        self.cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS presence_daily_totals AFTER INSERT ON presence
+            BEGIN
+                INSERT INTO daily_totals (date, duration) VALUES (DATE(NEW.start_time), NEW.duration)
+                ON CONFLICT(date) DO UPDATE SET duration = duration + excluded.duration;
+            END
+        ''')
 
     def close_db(self):
+        if self.flush_timer is not None:
+            self.root.after_cancel(self.flush_timer) # The flush below covers it
+            self.flush_timer = None
         if self.conn:
+            # Write out any sessions still waiting in the batch
+            self.flush_sessions()
             try:
                 self.conn.close()
-                print("Database connection closed.")
+                log.info("Database connection closed.")
             except sqlite3.Error as e:
-                print(f"Database error during closing: {e}")
+                log.error(f"Database error during closing: {e}")
             self.conn = None
             self.cursor = None
 
     def save_session(self, start_time, end_time, duration):
         if self.cursor:
-            try:
-                # Convert timestamps to human-readable strings
-                start_str = datetime.datetime.fromtimestamp(start_time).strftime("%Y-%m-%d %H:%M:%S")
-                end_str = datetime.datetime.fromtimestamp(end_time).strftime("%Y-%m-%d %H:%M:%S")
-
-                self.cursor.execute("INSERT INTO presence (start_time, end_time, duration) VALUES (?, ?, ?)",
-                                    (start_str, end_str, duration))
-                self.conn.commit()
-                print(f"Session saved: Start={start_str}, End={end_str}, Duration={duration:.2f}s")
-
-                # Update the total time for today after saving a session
+            # Convert timestamps to human-readable strings
+            # time.strftime formats the local time directly without building datetime objects
+            start_str = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(start_time))
+            end_str = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(end_time))
+
+            # Queue the session; it is written together with others in flush_sessions
+            self.pending_sessions.append((start_str, end_str, duration,
+                                          int(start_time), int(end_time), int(duration * 1000)))
+            log.info(f"Session recorded: Start={start_str}, End={end_str}, Duration={duration:.2f}s")
+
+            # Update the cached total time for today with the session we just recorded
+            if time.strftime("%Y-%m-%d") != self.total_time_date:
+                # The date rolled over since the total was loaded; reload it for the new day
+                self.flush_sessions() # Make sure the new session is part of the reloaded total
                 self.total_time_today = self.get_total_time_for_today()
-                if self.today_time_label: # Ensure label exists before updating
-                     self.today_time_label.config(text=f"Total Time Today: {self.format_duration(self.total_time_today)}")
-
-            except sqlite3.Error as e:
-                print(f"Failed to save session to database: {e}")
+            elif start_str.startswith(self.total_time_date):
+                self.total_time_today += duration
+            if self.today_time_label: # Ensure label exists before updating
+                 self.today_time_label.config(text=f"Total Time Today: {self.format_duration(self.total_time_today)}")
+
+            if len(self.pending_sessions) >= SESSION_FLUSH_EVERY:
+                self.flush_sessions()
+            elif self.flush_timer is None:
+                # Don't let a session sit only in memory for long while waiting for a full batch
+                self.flush_timer = self.root.after(SESSION_FLUSH_MAX_AGE_MS, self.flush_pending_sessions)
         else:
-            print("Database not connected. Session not saved.")
+            log.warning("Database not connected. Session not saved.")
+
+    def flush_pending_sessions(self):
+        # Age-based flush scheduled by save_session; retried later if the write fails
+        self.flush_timer = None
+        self.flush_sessions()
+        if self.pending_sessions and self.cursor:
+            self.flush_timer = self.root.after(SESSION_FLUSH_MAX_AGE_MS, self.flush_pending_sessions)
+
+    def flush_sessions(self):
+        # Writes all pending sessions in a single transaction (one commit instead of one per session)
+        if not self.pending_sessions or not self.cursor:
+            return
+        try:
+            self.cursor.execute("BEGIN IMMEDIATE")
+            self.cursor.executemany(INSERT_SESSION_SQL, self.pending_sessions)
+            self.conn.commit()
+            log.info(f"{len(self.pending_sessions)} session(s) saved to database.")
+            self.pending_sessions = []
+        except sqlite3.Error as e:
+            log.error(f"Failed to save sessions to database: {e}")
+            self.conn.rollback() # Keep the sessions pending and retry on the next flush
 
     def get_total_time_for_today(self):
         total_duration = 0
         if self.cursor:
             try:
-                today = datetime.date.today().strftime("%Y-%m-%d")
+                now = time.localtime()
+                # Local midnight today and tomorrow as epoch seconds (mktime normalizes day + 1 across month ends)
+                today_start = int(time.mktime((now.tm_year, now.tm_mon, now.tm_mday, 0, 0, 0, 0, 0, -1)))
+                tomorrow_start = int(time.mktime((now.tm_year, now.tm_mon, now.tm_mday + 1, 0, 0, 0, 0, 0, -1)))
                 # Select sum of duration for sessions whose start date is today
-                self.cursor.execute("SELECT SUM(duration) FROM presence WHERE DATE(start_time) = ?", (today,))
+                # An integer range on start_epoch is an index range scan on idx_presence_start_epoch
+                self.cursor.execute("SELECT SUM(duration_ms) FROM presence WHERE start_epoch >= ? AND start_epoch < ?",
+                                    (today_start, tomorrow_start))
                 result = self.cursor.fetchone()
                 if result and result[0] is not None:
-                    total_duration = result[0]
+                    total_duration = result[0] / 1000.0
+                self.total_time_date = time.strftime("%Y-%m-%d", now)
             except sqlite3.Error as e:
-                print(f"Failed to retrieve total time from database: {e}")
+                log.error(f"Failed to retrieve total time from database: {e}")
         return total_duration
 
     # --- GUI Methods ---
@@ -157,6 +380,21 @@ class PresenceTrackerApp:
         self.stop_button = tk.Button(button_frame, text="Stop", command=self.stop_tracker, state=tk.DISABLED)
         self.stop_button.grid(row=0, column=2, padx=5)
 
+    def show_frame(self, frame):
+        # Convert OpenCV frame (BGR) to RGB for Pillow
+        cv2image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        height, width = cv2image.shape[:2]
+
+        if self.frame_image is None or self.frame_size != (width, height):
+            # Allocate the Tk image once for the camera's frame size instead of once per frame
+            self.frame_size = (width, height)
+            self.frame_image = ImageTk.PhotoImage(Image.new('RGB', self.frame_size))
+            self.camera_label.imgtk = self.frame_image # Keep a reference!
+            self.camera_label.config(image=self.frame_image)
+
+        # Paste the new frame into the existing image; frombuffer wraps the array without copying it
+        self.frame_image.paste(Image.frombuffer('RGB', self.frame_size, cv2image, 'raw', 'RGB', 0, 1))
+
     def update_gui_state(self):
         # Updates button states and status label text/color based on application state
         if not self.running and not self.paused: # State: Stopped
@@ -186,36 +424,56 @@ class PresenceTrackerApp:
     # --- Core Logic Methods ---
     def start_tracker(self):
         if not self.running and not self.paused:
-            print("Starting tracker...")
+            log.info("Starting tracker...")
             self.running = True
             self.paused = False
             self._pause_start_time = None # Ensure pause tracking is reset
 
             # Ensure database is connected
             if not self.conn or not self.cursor:
-                 print("Database connection failed. Attempting to reconnect.")
+                 log.warning("Database connection failed. Attempting to reconnect.")
                  self.connect_db()
                  if not self.conn or not self.cursor:
-                      print("Failed to connect to database. Cannot start.")
+                      log.error("Failed to connect to database. Cannot start.")
                       self.running = False
                       self.update_gui_state()
                       return
 
+            # A worker from the previous run that outlived stop_infer_worker's timeout must finish first
+            if self.infer_thread:
+                self.infer_thread.join()
+                self.infer_thread = None
+            # Likewise a capture thread stalled in read(): it still holds (and will release) the previous camera
+            if self.capture_thread:
+                self.capture_thread.join()
+                self.capture_thread = None
+
             # Load YOLO model
+            # The inference buffer is only used by the warmup below and then by the worker, never concurrently
+            self.infer_buf = np.empty((DETECTION_BATCH_SIZE, INFER_IMGSZ, INFER_IMGSZ, 3), dtype=np.uint8)
             try:
-                self.model = YOLO('yolov8n.pt')
-                print("YOLOv8n model loaded successfully.")
+                self.load_and_warmup_model()
             except Exception as e:
-                 print(f"Failed to load YOLO model: {e}")
+                 log.error(f"Failed to load YOLO model: {e}")
                  self.running = False
+                 self.model = None # Release a model that loaded but failed to run
                  self.close_db()
                  self.update_gui_state()
                  return
 
             # Open Webcam
-            self.camera = cv2.VideoCapture(0) # 0 is default camera index
+            self.camera = cv2.VideoCapture(0, CAMERA_BACKEND) # 0 is default camera index
+            if not self.camera.isOpened():
+                # Native backend unavailable (e.g. OpenCV built without it); let OpenCV choose
+                self.camera = cv2.VideoCapture(0)
+            if sys.platform == 'win32':
+                # MJPG frames decode faster than raw YUY2 from DirectShow (set before the resolution)
+                self.camera.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+            self.camera.set(cv2.CAP_PROP_FRAME_WIDTH, CAMERA_WIDTH)
+            self.camera.set(cv2.CAP_PROP_FRAME_HEIGHT, CAMERA_HEIGHT)
+            self.camera.set(cv2.CAP_PROP_BUFFERSIZE, 1) # Keep the driver queue one frame deep so read() is never stale
             if not self.camera.isOpened():
-                print("Error: Could not open webcam.")
+                log.error("Could not open webcam.")
                 self.running = False
                 self.model = None # Release model reference
                 self.close_db()
@@ -224,11 +482,18 @@ class PresenceTrackerApp:
                 self.status_label.config(text="Status: Camera Error", fg="red")
                 return
 
+            # Start the inference worker with fresh queues so nothing carries over from a previous run
+            self.start_infer_worker()
+
             # Reset session and detection state for a fresh start
             self.session_active = False
             self.session_start_time = None
             self.current_session_duration = 0
             self.absence_start_time = None
+            self.negative_streak = 0
+            self.prev_thumb = None
+            self.det_batch.clear()
+            self.frames_since_batch_add = 0
             self.last_detection_run_time = time.time() # Start detection timer now
             self.detection_interval = 1.0 # Start checking frequently
 
@@ -236,25 +501,80 @@ class PresenceTrackerApp:
             self.total_time_today = self.get_total_time_for_today()
             self.today_time_label.config(text=f"Total Time Today: {self.format_duration(self.total_time_today)}")
             self.session_time_label.config(text="Current Session: 0s")
+            self.last_session_label_sec = -1
 
 
             self.update_gui_state() # Update buttons
+            self.start_capture_thread() # Start reading frames from the camera
             self.update_frame() # Start the main frame processing loop
 
+    def choose_model_path(self):
+        # Prefer the exported TensorRT FP16 engine on NVIDIA GPUs and the ONNX Runtime model otherwise
+        # (INT8 quantized when available on CPU-only machines)
+        # Fall back to the PyTorch weights if export_model.py has not been run yet
+        cuda_available = torch.cuda.is_available()
+        if cuda_available and os.path.exists(MODEL_ENGINE):
+            return MODEL_ENGINE
+        if not cuda_available and os.path.exists(MODEL_ONNX_INT8):
+            return MODEL_ONNX_INT8
+        # With a GPU but no engine, ONNX only beats the FP16 CUDA .pt path if ONNX Runtime can use the GPU too
+        # (the onnxruntime package in requirements.txt is CPU-only)
+        if os.path.exists(MODEL_ONNX) and (not cuda_available or onnxruntime_has_cuda()):
+            return MODEL_ONNX
+        return MODEL_WEIGHTS
+
+    def load_and_warmup_model(self):
+        # An exported model can be stale (e.g. built by an older export for another input size or batch) and fail
+        # to load or to run the warmup batches; the PyTorch weights accept any shape, so fall back to them
+        model_path = self.choose_model_path()
+        if model_path != MODEL_WEIGHTS:
+            try:
+                self.model = self.load_model(model_path)
+                self.warmup_model()
+                return
+            except Exception as e:
+                log.warning(f"Exported model '{model_path}' failed to load or run ({e}). "
+                            f"Falling back to '{MODEL_WEIGHTS}'; re-run export_model.py to rebuild it.")
+                self.model = None
+        self.model = self.load_model(MODEL_WEIGHTS)
+        self.warmup_model()
+
+    def load_model(self, model_path):
+        cuda_available = torch.cuda.is_available()
+        model = YOLO(model_path, task='detect')
+
+        self.predict_kwargs = {}
+        # Only the TensorRT engine and the PyTorch weights moved to CUDA are known to run on the GPU;
+        # uploading frames for an ONNX Runtime model on the CPU would just be copied back
+        self.gpu_preprocess = model_path == MODEL_ENGINE or (model_path == MODEL_WEIGHTS and cuda_available)
+        if model_path == MODEL_WEIGHTS and cuda_available:
+            # Eager PyTorch on the GPU: let cuDNN benchmark kernels for our fixed input shape, set TF32
+            # explicitly for anything left in FP32, fuse Conv+BN and run the forward pass in FP16
+            # (half=True makes Ultralytics cast both the model and the input tensor)
+            torch.backends.cudnn.benchmark = True
+            torch.backends.cuda.matmul.allow_tf32 = True
+            torch.backends.cudnn.allow_tf32 = True
+            model.to('cuda')
+            model.fuse()
+            self.predict_kwargs = {'device': 0, 'half': True}
+        log.info(f"YOLO model loaded successfully from '{model_path}'.")
+        return model
+
     def pause_resume_tracker(self):
         if not self.running:
             # Cannot pause/resume if not running
             return
 
         if not self.paused: # Currently Running, needs Pause
-            print("Pausing tracker...")
+            log.info("Pausing tracker...")
             self.paused = True
             self._pause_start_time = time.time() # Record the time when pause was initiated
+            self.cancel_frame_loop() # Resume starts a fresh loop
             self.update_gui_state() # Update buttons to show "Resume"
             self.status_label.config(text="Status: Paused", fg="orange") # Update status label
 
         else: # Currently Paused, needs Resume
-            print("Resuming tracker...")
+            log.info("Resuming tracker...")
             # Calculate how long the tracker was paused
             pause_duration = time.time() - self._pause_start_time if self._pause_start_time is not None else 0
 
@@ -283,8 +603,9 @@ class PresenceTrackerApp:
 
     def stop_tracker(self):
         if self.running or self.paused:
-            print("Stopping tracker...")
+            log.info("Stopping tracker...")
             self.running = False
+            self.cancel_frame_loop()
             self.paused = False
             self._pause_start_time = None # Ensure pause tracking is reset
 
@@ -302,178 +623,337 @@ class PresenceTrackerApp:
                  self.current_session_duration = 0
                  # Update GUI immediately
                  self.session_time_label.config(text="Current Session: 0s")
-                 print("Current session ended and saved due to stop.")
+                 self.last_session_label_sec = -1
+                 log.info("Current session ended and saved due to stop.")
 
-            # Release the webcam
+            # The capture thread releases the webcam itself once its current read() returns
+            self.stop_capture_thread()
             if self.camera:
-                self.camera.release()
                 self.camera = None
                 # Clear the video feed display in the GUI
                 if self.camera_label:
                      self.camera_label.config(image=None)
                      self.camera_label.image = None # Crucial to prevent garbage collection
+                self.frame_image = None # Reallocated on the next start
+                self.frame_size = None
 
             # Close the database connection
             self.close_db()
 
-            # Release the YOLO model
+            # Stop the inference worker and release the YOLO model
+            self.stop_infer_worker()
             self.model = None
 
             # Final GUI state update
             self.update_gui_state()
             self.status_label.config(text="Status: Stopped", fg="black")
-            # Update total time one last time from DB in case session was saved
-            self.total_time_today = self.get_total_time_for_today()
+            # Show the saved total (save_session already added the session that just ended)
             self.today_time_label.config(text=f"Total Time Today: {self.format_duration(self.total_time_today)}")
 
     def update_frame(self):
-        # This function is called repeatedly to process frames and update the GUI
-        # The frequency of calls is controlled by root.after()
+        # This function is called repeatedly to display frames, run the detection gate and update the GUI
+        # The frequency of calls is controlled by root.after(); frames come from the capture thread
 
-        if not self.running:
-             # If tracker is stopped, prevent further calls
+        if not self.running or self.paused:
+             # If tracker is stopped or paused, end the loop
+             # No frame processing or detection happens when paused; pause_resume_tracker restarts the loop
              return
 
-        if self.paused:
-             # If paused, just reschedule the next call to keep the loop alive
-             # No frame processing or detection happens when paused
-             self.root.after(30, self.update_frame) # Schedule next call (~30-40 FPS attempt)
-             return # Exit the rest of the function
-
-
-        # --- Process Frame (only if running and not paused) ---
-        ret, frame = self.camera.read()
-        if ret:
-            # Convert OpenCV frame (BGR) to RGB for Pillow
-            cv2image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            # Convert to Pillow Image
-            img = Image.fromarray(cv2image)
+        if self.capture_failed.is_set():
+            # The camera failed to read a frame (e.g., disconnected)
+            log.error("Failed to read frame from camera.")
+            self.stop_tracker() # Stop the tracker gracefully on camera error
+            self.status_label.config(text="Status: Camera Read Error", fg="red")
+            return
 
-            # Optional: Resize image to fit GUI or improve performance
-            # img = img.resize((640, 480))
+        current_time = time.time()
 
-            # Convert Pillow Image to Tkinter PhotoImage
-            imgtk = ImageTk.PhotoImage(image=img)
-            # Update the label to display the new frame
-            self.camera_label.imgtk = imgtk # Keep a reference!
-            self.camera_label.config(image=imgtk)
+        # --- Process Frame (only if the capture thread delivered a new one since the last call) ---
+        try:
+            frame = self.latest_frame.pop()
+        except IndexError:
+            frame = None
 
-            current_time = time.time()
+        if frame is not None:
+            # Display the frame in the GUI
+            self.show_frame(frame)
 
             # --- Detection Logic (runs based on detection_interval, not every frame) ---
             # Check if it's time to run YOLO inference
             if current_time - self.last_detection_run_time >= self.detection_interval:
-                 # print(f"Running detection (interval: {self.detection_interval:.1f}s)")
-                 self.last_detection_run_time = current_time # Record time of this detection run
-
-                 person_detected_in_this_run = False
-                 try:
-                     # Perform detection using YOLO model
-                     # classes=0 filters for 'person' class
-                     # conf=0.7 sets confidence threshold
-                     # persist=True helps with tracking between frames (optional but can improve session logic robustness)
-                     # verbose=False suppresses model output
-                     results = self.model.track(frame, classes=0, conf=0.7, persist=True, verbose=False)
-                     boxes = results[0].boxes # Get the bounding boxes
-
-                     # Check if any boxes correspond to detected persons
-                     person_detected_in_this_run = len(boxes) > 0
-
-                 except Exception as e:
-                      # Handle potential errors during detection (e.g., CUDA error, model issue)
-                      print(f"Error during YOLO detection: {e}")
-                      # Update status to indicate error, maybe keep detection interval short to retry
-                      self.status_label.config(text="Status: Detection Error", fg="orange")
-                      # Decide if error should stop the tracker? For now, just log and continue.
-                      # Set person_detected_in_this_run to False in case of error
-                      person_detected_in_this_run = False
-                      # The detection interval might stay short, leading to more retries.
-
-                 # --- Session and Absence Logic based on detection result ---
-                 if person_detected_in_this_run:
-                      # Person detected
-                      self.status_label.config(text="Status: Detected ✅", fg="green")
-                      self.absence_start_time = None # Reset the absence timer as presence is confirmed
-                      self.detection_interval = 1.0 # When a person is detected, check frequently (every 1 second)
-
-                      if not self.session_active:
-                          # If a person is detected and no session is active, start a new one
-                          self.session_start_time = current_time
-                          self.session_active = True
-                          print("Session started.")
-
-                 else: # Person not detected in this detection run
-                      self.status_label.config(text="Status: Not Detected ❌", fg="red")
-
-                      if self.session_active:
-                          # If a session is active, check for consecutive absence
-                          if self.absence_start_time is None:
-                              # This is the first detection run where person was not detected during an active session
-                              self.absence_start_time = current_time # Start the absence timer
-
-                          # Calculate the duration of the current consecutive absence
-                          absence_duration = current_time - self.absence_start_time
-
-                          if absence_duration >= self.absence_threshold:
-                              # Absence threshold reached (e.g., 3 seconds) - End the session
-                              # The session end time is when the absence started that triggered the end
-                              session_end_time = self.absence_start_time
-                              duration = session_end_time - self.session_start_time
-
-                              if duration > 0.1: # Only save sessions with meaningful duration
-                                  self.save_session(self.session_start_time, session_end_time, duration)
-
-                              # Reset session state
-                              self.session_active = False
-                              self.session_start_time = None
-                              self.current_session_duration = 0 # Reset for display
-                              # Update GUI immediately
-                              self.session_time_label.config(text="Current Session: 0s")
-
-                              self.absence_start_time = None # Reset absence timer after session ends
-                              self.detection_interval = 10.0 # When a session ends, check less frequently (every 10 seconds)
-                              print(f"Session ended due to {self.absence_threshold}s absence.")
-
-                          # If absence_duration < self.absence_threshold, the session remains active
-                          # The absence_start_time is kept to continue tracking absence duration
-
-                      else: # Session is not active and no person is detected
-                          # Keep checking less frequently when no session is active and no person is seen
-                          self.detection_interval = 10.0
-
-
-            # --- Update Current Session Timer Display ---
-            # This updates every frame (approx. 30-40 FPS) for smoother display
-            if self.session_active:
-                # Calculate current duration based on the session start time
-                self.current_session_duration = current_time - self.session_start_time
+                 # Tiny grayscale thumbnail to tell whether anything changed since the last inferred frame
+                 thumb = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), SCENE_THUMB_SIZE,
+                                    interpolation=cv2.INTER_AREA).astype(np.int16)
+                 if (self.negative_streak >= SCENE_GATE_MIN_NEGATIVES and self.prev_thumb is not None
+                         and current_time - self.prev_thumb_time < SCENE_GATE_MAX_AGE_S
+                         and np.abs(thumb - self.prev_thumb).mean() < SCENE_CHANGE_THRESHOLD):
+                      # Nobody was seen in the last few runs and the scene is unchanged: reuse that verdict and skip YOLO
+                      # (the gate is never used after a person was seen, so exits are not missed)
+                      self.last_detection_run_time = current_time
+                      self.apply_detection_result(False, current_time)
+                 else:
+                      # Hand the batch to the inference worker; if it is still busy with the previous one, drop this one
+                      # (frames kept during a long absence would be stale, so only the current frame is sent then)
+                      if self.detection_interval <= 1.0:
+                          frames = list(self.det_batch) + [frame]
+                      else:
+                          frames = [frame]
+                      try:
+                          self.infer_q.put_nowait(frames)
+                          self.last_detection_run_time = current_time # Record time of this detection run
+                          self.prev_thumb = thumb
+                          self.prev_thumb_time = current_time
+                          self.det_batch.clear()
+                          self.frames_since_batch_add = 0
+                      except queue.Full:
+                          pass
+            elif self.detection_interval <= 1.0:
+                 # Between detection runs, keep every BATCH_FRAME_STRIDE-th frame for the next batch
+                 self.frames_since_batch_add += 1
+                 if self.frames_since_batch_add >= BATCH_FRAME_STRIDE:
+                      self.det_batch.append(frame)
+                      self.frames_since_batch_add = 0
+
+        # Apply the latest detection result, if the worker has produced one since the last call
+        try:
+             person_detected_in_this_run, detection_error = self.result_q.get_nowait()
+        except queue.Empty:
+             pass
+        else:
+             if detection_error is not None:
+                  # Handle potential errors during detection (e.g., CUDA error, model issue)
+                  log.error(f"Error during YOLO detection: {detection_error}")
+                  # Update status to indicate error, maybe keep detection interval short to retry
+                  self.status_label.config(text="Status: Detection Error", fg="orange")
+                  # Decide if error should stop the tracker? For now, just log and continue.
+                  # The worker reports person_detected_in_this_run as False in case of error
+                  # The detection interval might stay short, leading to more retries.
+             # Only successful "no person" verdicts count towards enabling the static scene gate
+             if detection_error is None and not person_detected_in_this_run:
+                  self.negative_streak += 1
+             else:
+                  self.negative_streak = 0
+             self.apply_detection_result(person_detected_in_this_run, current_time)
+
+
+        # --- Update Current Session Timer Display ---
+        # The duration is recalculated on every call, but the label is only reconfigured when the shown second changes
+        if self.session_active:
+            # Calculate current duration based on the session start time
+            self.current_session_duration = current_time - self.session_start_time
+            session_sec = int(self.current_session_duration)
+            if session_sec != self.last_session_label_sec:
                 # Update the session time label in the GUI
-                self.session_time_label.config(text=f"Current Session: {self.format_duration(self.current_session_duration)}")
-            # If session is not active, the label is reset when the session ends
-            
-            # Update Total Time Today Display
-            # This label should show saved time + current session time if active
-            display_total = self.total_time_today # Start with the total from *saved* sessions for today
-            if self.session_active:
-                # Add the duration of the current *active* session to the saved total
-                display_total += self.current_session_duration
+                self.session_time_label.config(text=f"Current Session: {self.format_duration(session_sec)}")
+                self.last_session_label_sec = session_sec
+        # If session is not active, the label is reset when the session ends
+
+        # Update Total Time Today Display
+        # This label should show saved time + current session time if active
+        display_total = self.total_time_today # Start with the total from *saved* sessions for today
+        if self.session_active:
+            # Add the duration of the current *active* session to the saved total
+            display_total += self.current_session_duration
+
+        # Update the total time label in the GUI (only when the shown second changes)
+        total_sec = int(display_total)
+        if total_sec != self.last_total_label_sec:
+            self.today_time_label.config(text=f"Total Time Today: {self.format_duration(total_sec)}")
+            self.last_total_label_sec = total_sec
+        # --- Schedule the next frame update ---
+        # Call update_frame again after a short delay to pick up the next frame
+        self.frame_after_id = self.root.after(self._frame_delay_ms(), self.update_frame)
+
+    def cancel_frame_loop(self):
+        # Drops the scheduled update_frame call so a later resume/start never runs two loops side by side
+        if self.frame_after_id is not None:
+            self.root.after_cancel(self.frame_after_id)
+            self.frame_after_id = None
+
+
+    def _frame_delay_ms(self):
+        # Refresh the display at full rate only while detection runs frequently (person present or recently absent)
+        # During long absences detection runs every 10s and the capture thread slows down to match
+        if self.detection_interval <= 1.0:
+            return ACTIVE_FRAME_DELAY_MS
+        return IDLE_FRAME_DELAY_MS
+
+    def start_capture_thread(self):
+        self.latest_frame = collections.deque(maxlen=1)
+        self.capture_stop = threading.Event()
+        self.capture_failed = threading.Event()
+        self.capture_thread = threading.Thread(target=self._capture_worker,
+                                               args=(self.camera, self.latest_frame,
+                                                     self.capture_stop, self.capture_failed),
+                                               daemon=True)
+        self.capture_thread.start()
+
+    def stop_capture_thread(self):
+        # Ask the capture thread to exit and wait briefly for its current read()
+        if self.capture_thread:
+            self.capture_stop.set()
+            self.capture_thread.join(timeout=CAPTURE_STOP_TIMEOUT_S)
+            if self.capture_thread.is_alive():
+                # Releasing a VideoCapture while another thread reads it is unsafe; the thread releases it when
+                # read() returns. Keep the reference; start_tracker waits for it before opening the camera again
+                log.warning("Camera read is stalled; the camera will be released when it returns.")
+            else:
+                self.capture_thread = None
 
-            # Update the total time label in the GUI
-            self.today_time_label.config(text=f"Total Time Today: {self.format_duration(display_total)}")
-            # --- Schedule the next frame update ---
-            # Call update_frame again after a short delay to process the next frame
-            self.root.after(30, self.update_frame) # Adjust delay for desired frame rate (e.g., 30ms for ~33 FPS)
+    def _capture_worker(self, camera, latest_frame, stop_event, failed_event):
+        # Reads frames as the camera delivers them and keeps only the most recent one for the Tk loop
+        # The camera is only ever used by this thread once it starts, so it is also released here
+        try:
+            while not stop_event.is_set():
+                if self.paused:
+                    time.sleep(IDLE_FRAME_DELAY_MS / 1000)
+                    continue
+                ret, frame = camera.read()
+                if not ret:
+                    failed_event.set() # update_frame stops the tracker on the Tk thread
+                    break
+                latest_frame.append(frame)
+                if self.detection_interval > 1.0:
+                    # Long absence: read at the idle rate instead of the camera's full rate
+                    time.sleep(IDLE_FRAME_DELAY_MS / 1000)
+        finally:
+            camera.release()
+
+    def start_infer_worker(self):
+        self.infer_q = queue.Queue(maxsize=1)
+        self.result_q = queue.Queue(maxsize=1)
+        self.infer_thread = threading.Thread(target=self._infer_worker,
+                                             args=(self.model, self.infer_q, self.result_q),
+                                             daemon=True)
+        self.infer_thread.start()
+
+    def stop_infer_worker(self):
+        if self.infer_thread:
+            # Discard any frame still waiting so the stop sentinel always fits in the single slot
+            try:
+                self.infer_q.get_nowait()
+            except queue.Empty:
+                pass
+            self.infer_q.put_nowait(None)
+            # Wait for the batch in flight so a quick restart never reallocates infer_buf/predict_kwargs under it
+            self.infer_thread.join(timeout=INFER_STOP_TIMEOUT_S)
+            if self.infer_thread.is_alive():
+                # Keep the reference; start_tracker waits for it before touching the shared state
+                log.warning("Inference worker did not stop in time.")
+            else:
+                self.infer_thread = None
+
+    def _infer_worker(self, model, infer_q, result_q):
+        # Consumes frame batches from infer_q and publishes detection results to result_q
+        # PyTorch/ONNX Runtime release the GIL inside the forward pass, so a thread is enough
+        while True:
+            frames = infer_q.get()
+            if frames is None: # Stop sentinel from stop_infer_worker
+                break
+            try:
+                result = (self.detect_person(model, frames), None)
+            except Exception as e:
+                result = (False, e)
 
-        else:
-            # If ret is False, the camera failed to read a frame (e.g., disconnected)
-            print("Error: Failed to read frame from camera.")
-            self.stop_tracker() # Stop the tracker gracefully on camera error
-            self.status_label.config(text="Status: Camera Read Error", fg="red")
+            # Replace any unread result so the Tk loop always sees the most recent one
+            try:
+                result_q.get_nowait()
+            except queue.Empty:
+                pass
+            result_q.put_nowait(result)
+
+    def detect_person(self, model, frames):
+        # Perform detection using YOLO model on a batch of frames in a single call
+        # classes=0 filters for 'person' class
+        # conf=0.7 sets confidence threshold
+        # verbose=False suppresses model output
+        # Plain predict: only the box count is used, so the tracker's per-frame association work is skipped
+        results = model.predict(self.prepare_input(frames), classes=0, conf=0.7, verbose=False,
+                                imgsz=INFER_IMGSZ, **self.predict_kwargs)
+        # A person counts as detected if any frame in the batch has a person box
+        return any(len(result.boxes) > 0 for result in results)
+
+    def warmup_model(self):
+        # Run throwaway forwards so kernel JIT / cuDNN autotuning happen now instead of on the first real detection
+        # The second call per batch size runs with the kernels cuDNN benchmark picked for that input shape
+        dummy_frame = np.zeros((CAMERA_HEIGHT, CAMERA_WIDTH, 3), dtype=np.uint8)
+        for batch_size in (1, DETECTION_BATCH_SIZE):
+            for _ in range(2):
+                self.detect_person(self.model, [dummy_frame] * batch_size)
+
+    def prepare_input(self, frames):
+        # Resize each frame once with OpenCV's vectorized resize into its slot of the persistent model-sized buffer
+        # (square inputs mean Ultralytics has nothing left to letterbox)
+        batch = self.infer_buf[:len(frames)]
+        for frame, slot in zip(frames, batch):
+            cv2.resize(frame, (INFER_IMGSZ, INFER_IMGSZ), dst=slot, interpolation=cv2.INTER_LINEAR)
+        # Without a GPU, hand the BGR images to Ultralytics' own CPU preprocessing as one batch
+        if not self.gpu_preprocess:
+            return list(batch)
+        # Upload the small BGR batch once, then do BGR->RGB, NHWC->NCHW and [0, 1] scaling on the GPU
+        # Ultralytics skips its CPU letterbox/normalize for tensor inputs (BCHW, RGB, float, stride-divisible)
+        x = torch.from_numpy(batch).to('cuda', non_blocking=True)
+        return x[..., [2, 1, 0]].permute(0, 3, 1, 2).float().div_(255)
+
+    def apply_detection_result(self, person_detected, current_time):
+        # Updates session and absence state from one detection result (runs on the Tk thread)
+        # --- Session and Absence Logic based on detection result ---
+        if person_detected:
+             # Person detected
+             self.status_label.config(text="Status: Detected ✅", fg="green")
+             self.absence_start_time = None # Reset the absence timer as presence is confirmed
+             self.detection_interval = 1.0 # When a person is detected, check frequently (every 1 second)
+
+             if not self.session_active:
+                 # If a person is detected and no session is active, start a new one
+                 self.session_start_time = current_time
+                 self.session_active = True
+                 log.info("Session started.")
+
+        else: # Person not detected in this detection run
+             self.status_label.config(text="Status: Not Detected ❌", fg="red")
+
+             if self.session_active:
+                 # If a session is active, check for consecutive absence
+                 if self.absence_start_time is None:
+                     # This is the first detection run where person was not detected during an active session
+                     self.absence_start_time = current_time # Start the absence timer
+
+                 # Calculate the duration of the current consecutive absence
+                 absence_duration = current_time - self.absence_start_time
+
+                 if absence_duration >= self.absence_threshold:
+                     # Absence threshold reached (e.g., 3 seconds) - End the session
+                     # The session end time is when the absence started that triggered the end
+                     session_end_time = self.absence_start_time
+                     duration = session_end_time - self.session_start_time
+
+                     if duration > 0.1: # Only save sessions with meaningful duration
+                         self.save_session(self.session_start_time, session_end_time, duration)
+
+                     # Reset session state
+                     self.session_active = False
+                     self.session_start_time = None
+                     self.current_session_duration = 0 # Reset for display
+                     # Update GUI immediately
+                     self.session_time_label.config(text="Current Session: 0s")
+                     self.last_session_label_sec = -1
+
+                     self.absence_start_time = None # Reset absence timer after session ends
+                     self.detection_interval = 10.0 # When a session ends, check less frequently (every 10 seconds)
+                     log.info(f"Session ended due to {self.absence_threshold}s absence.")
+
+                 # If absence_duration < self.absence_threshold, the session remains active
+                 # The absence_start_time is kept to continue tracking absence duration
+
+             else: # Session is not active and no person is detected
+                 # Keep checking less frequently when no session is active and no person is seen
+                 self.detection_interval = 10.0
 
 
     def on_closing(self):
         # This method is called when the user clicks the window's close button
-        print("Closing application...")
+        log.info("Closing application...")
         self.stop_tracker() # Perform cleanup (stop camera, save session, close DB)
         self.root.destroy() # Close the Tkinter window
         sys.exit() # Ensure the application process exits cleanly
@@ -481,6 +961,8 @@ class PresenceTrackerApp:
 
 # --- Main Execution Block ---
 if __name__ == "__main__":
+    # Route log messages through a background listener before anything logs
+    setup_logging()
     # Create the main Tkinter window
     root = tk.Tk()
     # Create an instance of our PresenceTrackerApp
@@ -1,11 +1,21 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import sqlite3
-import plotly.express as px
+import plotly.graph_objects as go
 import datetime
+import io
 
 # --- Configuration ---
 DATABASE_FILE = 'presence.db'
+SESSION_ROW_LIMIT = 10000 # Maximum sessions loaded for the timeline chart
+TABLE_PAGE_SIZE = 200 # Sessions shown per page of the session table
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S' # How the tracker stores start_time/end_time
+CACHE_TTL = 60 # Seconds query results stay cached before new sessions from the tracker show up
+TIMELINE_MAX_POINTS = 1500 # Sessions above this are downsampled (LTTB) before the timeline is sent to the browser
+HOUR_LABELS = [f"{h}:00" for h in range(24)] # X-axis labels and category order for the hourly chart
+FIG_CACHE_ENTRIES = 4 # Figures kept per chart builder (the inputs change whenever new sessions arrive)
+CSV_CHUNK_SIZE = 10000 # Rows written per chunk when building the CSV export
 
 # --- Helper Functions ---
 
@@ -17,53 +27,156 @@ def format_duration(seconds):
     h, m = divmod(m, 60)
     return f"{h:d}h {m:02d}m {s:02d}s"
 
-def get_data(start_date, end_date):
-    """Fetches session data from the database within a date range."""
-    conn = None
+def lttb_indices(x, y, n_out):
+    """Picks `n_out` row indices that preserve the shape of a line (Largest-Triangle-Three-Buckets)."""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    # Interior points are split into n_out - 2 buckets; the first and last points are always kept
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    edges = np.append(edges, n) # The final "next bucket" is just the last point
+    indices = np.empty(n_out, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    a = 0 # Point selected in the previous bucket
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        avg_x = x[end:edges[i + 2]].mean() # Average of the next bucket
+        avg_y = y[end:edges[i + 2]].mean()
+        # Keep the point forming the largest triangle with the previous pick and the next bucket's average
+        areas = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(areas.argmax())
+        indices[i + 1] = a
+    return indices
+
+def format_durations(seconds):
+    """Formats a Series of seconds into Hh M:S strings (column-wise format_duration)."""
+    secs = pd.Series(seconds.to_numpy(dtype=np.float64, na_value=0).astype(np.int64)) # Works for NumPy and Arrow dtypes
+    h, m, s = secs // 3600, (secs % 3600) // 60, secs % 60
+    return h.astype(str) + "h " + m.astype(str).str.zfill(2) + "m " + s.astype(str).str.zfill(2) + "s"
+
+@st.cache_resource
+def get_conn():
+    """Opens the dashboard's shared read-only SQLite connection (once per server process)."""
+    # mode=ro: never writes (the tracker's connect_db creates the schema and indexes) and fails instead of
+    # creating an empty database when presence.db is missing; a failed open is not cached, so it is retried
+    conn = sqlite3.connect(f"file:{DATABASE_FILE}?mode=ro", uri=True,
+                           check_same_thread=False, isolation_level=None) # Autocommit; shared across script runs
+    conn.execute("PRAGMA mmap_size=268435456") # Map up to 256 MB of the file instead of read() calls
+    conn.execute("PRAGMA cache_size=-20000") # ~20 MB page cache
+    return conn
+
+def query_df(query, params, description, **read_kwargs):
+    """Runs a read query and returns the result as a DataFrame (empty on error)."""
     df = pd.DataFrame() # Return empty DataFrame by default
     try:
-        conn = sqlite3.connect(DATABASE_FILE)
-        # SQL query to select data within the specified date range (inclusive)
-        # Use DATE() function to compare only the date part of the TEXT timestamp
-        query = """
-        SELECT start_time, end_time, duration
-        FROM presence
-        WHERE DATE(start_time) BETWEEN ? AND ?
-        ORDER BY start_time
-        """
-        # Convert date objects to string format expected by SQLite DATE()
-        start_date_str = start_date.strftime('%Y-%m-%d')
-        end_date_str = end_date.strftime('%Y-%m-%d')
-
-        df = pd.read_sql_query(query, conn, params=(start_date_str, end_date_str))
-
-        # Convert time columns to datetime objects for plotting and analysis
-        df['start_time'] = pd.to_datetime(df['start_time'])
-        df['end_time'] = pd.to_datetime(df['end_time'])
-
+        df = pd.read_sql_query(query, get_conn(), params=params, **read_kwargs)
     except sqlite3.Error as e:
-        st.error(f"Database error: {e}")
+        st.error(f"Database error fetching {description}: {e}")
     except Exception as e:
-        st.error(f"An error occurred while fetching data: {e}")
-    finally:
-        if conn:
-            conn.close()
+        st.error(f"An error occurred while fetching {description}: {e}")
+    return df
+
+def date_params(start_date, end_date):
+    """Converts an inclusive date range to half-open start_time bounds [start, end + 1 day)."""
+    # start_time is stored as "YYYY-MM-DD HH:MM:SS", so plain string comparison against date
+    # prefixes selects whole days and, unlike DATE(start_time), can use the start_time index
+    end_plus_one = end_date + datetime.timedelta(days=1)
+    return (start_date.strftime('%Y-%m-%d'), end_plus_one.strftime('%Y-%m-%d'))
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def get_aggregates(start_date, end_date):
+    """Fetches the range summary, per-hour totals and per-day totals in a single query."""
+    # One statement, one scan of the matching rows: the three aggregates are tagged by `kind` and split here.
+    # Days come back as midnight epoch seconds (integer group keys) rather than date strings
+    query = """
+    WITH base AS (
+        SELECT start_time, duration
+        FROM presence
+        WHERE start_time >= ? AND start_time < ?
+    )
+    SELECT 'total' AS kind, NULL AS bucket,
+           COUNT(*) AS sessions,
+           COALESCE(SUM(duration), 0) AS duration,
+           COALESCE(AVG(duration), 0) AS average_duration,
+           COALESCE(MAX(duration), 0) AS max_duration
+    FROM base
+    UNION ALL
+    SELECT 'hour', CAST(strftime('%H', start_time) AS INTEGER), COUNT(*), SUM(duration), NULL, NULL
+    FROM base GROUP BY 2
+    UNION ALL
+    SELECT 'day', CAST(strftime('%s', DATE(start_time)) AS INTEGER), COUNT(*), SUM(duration), NULL, NULL
+    FROM base GROUP BY 2
+    ORDER BY 1, 2
+    """
+    df = query_df(query, date_params(start_date, end_date), "aggregates")
+    summary = {'total_sessions': 0, 'total_duration': 0, 'average_duration': 0, 'max_duration': 0}
+    hourly = pd.DataFrame({'start_hour': pd.Series(dtype='int64'), 'duration': pd.Series(dtype='float64')})
+    daily = pd.DataFrame({'start_date': pd.Series(dtype='datetime64[ns]'), 'duration': pd.Series(dtype='float64')})
+    if df.empty:
+        return summary, hourly, daily
+
+    totals = df[df['kind'] == 'total'].iloc[0]
+    summary = {'total_sessions': int(totals['sessions']),
+               'total_duration': totals['duration'],
+               'average_duration': totals['average_duration'],
+               'max_duration': totals['max_duration']}
+
+    hour_rows = df[df['kind'] == 'hour']
+    hourly = pd.DataFrame({'start_hour': hour_rows['bucket'].astype('int64').to_numpy(),
+                           'duration': hour_rows['duration'].to_numpy()})
+
+    day_rows = df[df['kind'] == 'day']
+    daily = pd.DataFrame({'start_date': pd.to_datetime(day_rows['bucket'].astype('int64').to_numpy(), unit='s'), # datetime64 for plotly
+                          'duration': day_rows['duration'].to_numpy()})
+    return summary, hourly, daily
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def get_sessions(start_date, end_date, limit=None, offset=0):
+    """Fetches individual sessions within a date range, optionally one `limit`-row page starting at `offset`."""
+    # SQL query to select data within the specified date range (inclusive)
+    query = """
+    SELECT start_time, end_time, duration
+    FROM presence
+    WHERE start_time >= ? AND start_time < ?
+    ORDER BY start_time
+    """
+    params = date_params(start_date, end_date)
+    if limit is not None:
+        query += " LIMIT ? OFFSET ?"
+        params += (limit, offset)
+    # Arrow-backed columns: the strings and numbers stay in Arrow buffers instead of boxed Python objects,
+    # which is also what st.dataframe serializes to
+    df = query_df(query, params, "sessions", dtype_backend='pyarrow')
+    if df.columns.empty:
+        # The query failed (already reported by query_df); the chart, table and CSV still expect these columns
+        return pd.DataFrame({'start_time': pd.Series(dtype='datetime64[ns]'),
+                             'end_time': pd.Series(dtype='datetime64[ns]'),
+                             'duration': pd.Series(dtype='float64')})
+    # Convert time columns to datetime objects for plotting and display (also on an empty page, for the .dt accessors)
+    # An explicit format skips per-row format inference; cache=True parses repeated values once
+    df['start_time'] = pd.to_datetime(df['start_time'], format=TIMESTAMP_FORMAT, cache=True, errors='coerce')
+    df['end_time'] = pd.to_datetime(df['end_time'], format=TIMESTAMP_FORMAT, cache=True, errors='coerce')
     return df
 
-def get_total_time_for_today():
-    """Calculates total presence time for the current day."""
-    conn = None
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def get_total_time_for_today(today):
+    """Calculates total presence time for the given day (passed in so the cache key rolls over at midnight)."""
     total_duration = 0
     try:
-        conn = sqlite3.connect(DATABASE_FILE)
-        today_str = datetime.date.today().strftime('%Y-%m-%d')
-        query = """
-        SELECT SUM(duration)
-        FROM presence
-        WHERE DATE(start_time) = ?
-        """
-        cursor = conn.cursor()
-        cursor.execute(query, (today_str,))
+        conn = get_conn()
+        has_daily_totals = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='daily_totals'").fetchone()
+        if has_daily_totals:
+            # Maintained by the tracker's insert trigger, so this is a single primary-key lookup
+            cursor = conn.execute("SELECT duration FROM daily_totals WHERE date = ?", (today.strftime('%Y-%m-%d'),))
+        else:
+            # Database not yet opened by a tracker that keeps daily_totals; sum today's sessions instead
+            query = """
+            SELECT SUM(duration)
+            FROM presence
+            WHERE start_time >= ? AND start_time < ?
+            """
+            cursor = conn.execute(query, date_params(today, today))
         result = cursor.fetchone()
         if result and result[0] is not None:
             total_duration = result[0]
@@ -71,11 +184,163 @@ def get_total_time_for_today():
         st.error(f"Database error fetching total time today: {e}")
     except Exception as e:
         st.error(f"An error occurred fetching total time today: {e}")
-    finally:
-        if conn:
-            conn.close()
     return total_duration
 
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def make_csv(start_date, end_date):
+    """Builds the CSV export of every session within a date range."""
+    # The export contains every session in the range, not just the rows loaded for display
+    all_sessions = get_sessions(start_date, end_date)
+    buf = io.BytesIO()
+    # Written straight into a bytes buffer in chunks, without an intermediate Python string
+    all_sessions[['start_time', 'end_time', 'duration']].to_csv(buf, index=False, encoding='utf-8', chunksize=CSV_CHUNK_SIZE)
+    return buf.getvalue()
+
+
+# --- Chart Builders ---
+# Cached on the (small) aggregated data, so reruns with unchanged data skip Plotly figure construction;
+# the charts are rendered with stable keys so Streamlit updates the existing components in place.
+# max_label is the pre-formatted largest value shown in the Y-axis title. Figures are built with
+# graph_objects directly from the arrays; Plotly Express would first rewrap them into a tidy frame
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=FIG_CACHE_ENTRIES, show_spinner=False)
+def build_hourly_fig(hourly_durations, max_label):
+    """Builds the total-duration-per-hour bar chart from 24 hourly totals."""
+    fig_hourly = go.Figure(go.Bar(
+        x=HOUR_LABELS,
+        y=hourly_durations,
+        hovertemplate='Hour of Day=%{x}<br>Total Duration (seconds)=%{y:.2f}<extra></extra>' # Show duration with 2 decimal places on hover
+    ))
+    fig_hourly.update_layout(
+        title='Total Presence Duration per Hour of Day',
+        xaxis={'title': 'Hour of Day', 'categoryorder':'array', 'categoryarray':HOUR_LABELS},
+        yaxis_title='Total Duration (' + max_label + ')' # Custom Y-axis title
+    )
+    return fig_hourly
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=FIG_CACHE_ENTRIES, show_spinner=False)
+def build_sessions_fig(data_sorted_by_time, max_label):
+    """Builds the duration-of-each-session line chart."""
+    x = data_sorted_by_time['start_time'].to_numpy(dtype='datetime64[ns]')
+    y = data_sorted_by_time['duration'].to_numpy(dtype=np.float64)
+    if len(x) > TIMELINE_MAX_POINTS:
+        # The browser can't show more points than pixel columns; keep the ones that carry the shape
+        keep = lttb_indices(x.astype(np.int64).astype(np.float64), y, TIMELINE_MAX_POINTS)
+        x, y = x[keep], y[keep]
+
+    # Scattergl: one WebGL trace instead of an SVG node per point
+    fig_sessions_over_time = go.Figure(go.Scattergl(
+        x=x,
+        y=y,
+        mode='lines',
+        hovertemplate='Session Start Time=%{x}<br>Duration (seconds)=%{y:.2f}<extra></extra>' # Show duration with 2 decimal places
+    ))
+    fig_sessions_over_time.update_layout(
+        title='Duration of Each Presence Session',
+        xaxis_title='Session Start Time',
+        yaxis_title='Duration (' + max_label + ')' # Custom Y-axis title
+    )
+    return fig_sessions_over_time
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=FIG_CACHE_ENTRIES, show_spinner=False)
+def build_daily_fig(daily_activity, max_label):
+    """Builds the total-duration-per-day bar chart."""
+    fig_daily = go.Figure(go.Bar(
+        x=daily_activity['start_date'].to_numpy(),
+        y=daily_activity['duration'].to_numpy(),
+        hovertemplate='Date=%{x}<br>Total Duration (seconds)=%{y:.2f}<extra></extra>'
+    ))
+    fig_daily.update_layout(
+        title='Total Presence Duration per Day',
+        xaxis_title='Date',
+        yaxis_title='Total Duration (' + max_label + ')' # Custom Y-axis title
+    )
+    return fig_daily
+
+
+# --- Page Sections ---
+
+# A fragment: widgets in here (e.g. Prepare CSV) rerun only this section, not the whole page
+@st.fragment
+def render_history(start_date, end_date):
+    """Renders the metrics, charts, table and export for a date range."""
+    # --- Display Filtered Data Metrics ---
+    summary, hourly_totals, daily_activity = get_aggregates(start_date, end_date)
+    if summary['total_sessions'] == 0:
+        st.warning("No presence data available for the selected date range.")
+    else:
+        st.subheader(f"Data from {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}")
+
+        # Metrics for the filtered data (computed by SQLite)
+        total_sessions = int(summary['total_sessions'])
+
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Total Sessions", total_sessions)
+        col2.metric("Total Time in Range", format_duration(summary['total_duration']))
+        col3.metric("Average Session Duration", format_duration(summary['average_duration']))
+        max_session_label = format_duration(summary['max_duration']) # Longest session, already computed by SQLite
+
+        st.markdown("---") # Separator
+
+        # --- Visualizations ---
+        st.header("Visualizations")
+
+        # 1. Hourly Activity Bar Chart
+        st.subheader("Hourly Activity (Total Duration per Hour)")
+        # Ensure all hours (0-23) are present, even if no activity; reindex aligns on the hour index directly
+        hourly_durations = hourly_totals.set_index('start_hour')['duration'].reindex(range(24), fill_value=0.0)
+
+        st.plotly_chart(build_hourly_fig(hourly_durations.to_numpy(), format_duration(hourly_durations.max())), use_container_width=True, key='hourly_chart')
+
+
+        # 2. Session Durations Over Time (Line/Scatter)
+        st.subheader("Session Durations Over Time")
+        # Raw rows are only needed for the per-session chart; cap how many are loaded
+        data_sorted_by_time = get_sessions(start_date, end_date, limit=SESSION_ROW_LIMIT) # Already ordered by start_time
+        if total_sessions > SESSION_ROW_LIMIT:
+            st.info(f"Showing the first {SESSION_ROW_LIMIT} of {total_sessions} sessions. Download the CSV for all of them.")
+
+        st.plotly_chart(build_sessions_fig(data_sorted_by_time, max_session_label), use_container_width=True, key='sessions_chart')
+
+        # 3. Daily Total Activity Bar Chart (Replacing Heatmap for simplicity and clarity)
+        st.subheader("Daily Total Presence")
+
+        st.plotly_chart(build_daily_fig(daily_activity, format_duration(daily_activity['duration'].max())), use_container_width=True, key='daily_chart')
+
+
+        st.markdown("---") # Separator
+
+        # --- Session Table ---
+        st.header("Session Data Table")
+        # Only one page of rows is queried and sent to the browser; changing page reruns just this fragment
+        page_count = (total_sessions - 1) // TABLE_PAGE_SIZE + 1
+        page = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1)
+        first_row = (page - 1) * TABLE_PAGE_SIZE
+        page_sessions = get_sessions(start_date, end_date, limit=TABLE_PAGE_SIZE, offset=first_row)
+        st.caption(f"Sessions {first_row + 1}-{first_row + len(page_sessions)} of {total_sessions}")
+        # Only the three display columns are built, straight from the loaded sessions (no copy/rename of the frame)
+        st.dataframe({
+            'Start Time': page_sessions['start_time'].dt.strftime(TIMESTAMP_FORMAT).to_numpy(),
+            'End Time': page_sessions['end_time'].dt.strftime(TIMESTAMP_FORMAT).to_numpy(),
+            'Duration': format_durations(page_sessions['duration']).to_numpy()
+        }, use_container_width=True)
+
+
+        # --- CSV Export ---
+        st.subheader("Export Data")
+        # The CSV is only built (and sent to the browser) once asked for, then reused for the same range
+        csv_range = (start_date, end_date)
+        if st.button("Prepare CSV"):
+            st.session_state.csv_range = csv_range
+
+        if st.session_state.get('csv_range') == csv_range:
+            st.download_button(
+                label="Download Session Data as CSV",
+                data=make_csv(start_date, end_date),
+                file_name=f"presence_sessions_{start_date.strftime('%Y%m%d')}_to_{end_date.strftime('%Y%m%d')}.csv",
+                mime='text/csv',
+            )
+
 
 # --- Streamlit App ---
 
@@ -85,7 +350,7 @@ st.title("🧑‍💻 Person Presence Analytics Dashboard")
 
 # --- Display Total Time Today (Always based on current date) ---
 st.header("Today's Summary")
-total_today_seconds = get_total_time_for_today()
+total_today_seconds = get_total_time_for_today(datetime.date.today())
 st.metric("Total Time Today", format_duration(total_today_seconds))
 
 st.markdown("---") # Separator
@@ -104,124 +369,9 @@ end_date_filter = st.sidebar.date_input("Select End Date", end_date)
 # Ensure start date is not after end date
 if start_date_filter > end_date_filter:
     st.sidebar.error("Error: Start date must be before or on the end date.")
-    data_filtered = pd.DataFrame() # Load empty data if date range is invalid
-else:
-    # Fetch filtered data
-    data_filtered = get_data(start_date_filter, end_date_filter)
-
-
-# --- Display Filtered Data Metrics ---
-if data_filtered.empty:
-    st.warning("No presence data available for the selected date range.")
+    st.warning("No presence data available for the selected date range.") # Skip queries if date range is invalid
 else:
-    st.subheader(f"Data from {start_date_filter.strftime('%Y-%m-%d')} to {end_date_filter.strftime('%Y-%m-%d')}")
-
-    # Calculate metrics for the filtered data
-    total_sessions = len(data_filtered)
-    total_duration_filtered = data_filtered['duration'].sum()
-    average_session_duration = data_filtered['duration'].mean() if total_sessions > 0 else 0
-
-    col1, col2, col3 = st.columns(3)
-    col1.metric("Total Sessions", total_sessions)
-    col2.metric("Total Time in Range", format_duration(total_duration_filtered))
-    col3.metric("Average Session Duration", format_duration(average_session_duration))
-
-    st.markdown("---") # Separator
-
-    # --- Visualizations ---
-    st.header("Visualizations")
-
-    # 1. Hourly Activity Bar Chart
-    st.subheader("Hourly Activity (Total Duration per Hour)")
-    # Extract hour from start_time
-    data_filtered['start_hour'] = data_filtered['start_time'].dt.hour
-    hourly_activity = data_filtered.groupby('start_hour')['duration'].sum().reset_index()
-    hourly_activity['start_hour_str'] = hourly_activity['start_hour'].astype(str) + ":00" # For better x-axis labels
-    # Ensure all hours (0-23) are present, even if no activity
-    all_hours = pd.DataFrame({'start_hour': range(24)})
-    hourly_activity = pd.merge(all_hours, hourly_activity, on='start_hour', how='left').fillna(0)
-    hourly_activity['start_hour_str'] = hourly_activity['start_hour'].astype(str) + ":00" # Recreate after merge
-    hourly_activity = hourly_activity.sort_values('start_hour') # Ensure correct order
-
-    fig_hourly = px.bar(
-        hourly_activity,
-        x='start_hour_str',
-        y='duration',
-        title='Total Presence Duration per Hour of Day',
-        labels={'start_hour_str': 'Hour of Day', 'duration': 'Total Duration (seconds)'},
-        hover_data={'duration': ':.2f'} # Show duration with 2 decimal places on hover
-    )
-    fig_hourly.update_layout(xaxis={'categoryorder':'array', 'categoryarray':hourly_activity['start_hour_str']})
-    fig_hourly.update_yaxes(title_text='Total Duration (' + format_duration(hourly_activity['duration'].max() or 0) + ')') # Custom Y-axis title
-
-    st.plotly_chart(fig_hourly, use_container_width=True)
-
-
-    # 2. Session Durations Over Time (Line/Scatter)
-    st.subheader("Session Durations Over Time")
-    # Sort by start time for the line graph
-    data_sorted_by_time = data_filtered.sort_values('start_time')
-
-    fig_sessions_over_time = px.line(
-        data_sorted_by_time,
-        x='start_time',
-        y='duration',
-        title='Duration of Each Presence Session',
-        labels={'start_time': 'Session Start Time', 'duration': 'Duration (seconds)'},
-        hover_data={'duration': ':.2f', 'start_time': True} # Show duration with 2 decimal places
-    )
-    fig_sessions_over_time.update_yaxes(title_text='Duration (' + format_duration(data_sorted_by_time['duration'].max() or 0) + ')') # Custom Y-axis title
-
-    st.plotly_chart(fig_sessions_over_time, use_container_width=True)
-
-    # 3. Daily Total Activity Bar Chart (Replacing Heatmap for simplicity and clarity)
-    st.subheader("Daily Total Presence")
-    # Extract date from start_time
-    data_filtered['start_date'] = data_filtered['start_time'].dt.date
-    daily_activity = data_filtered.groupby('start_date')['duration'].sum().reset_index()
-    daily_activity['start_date'] = pd.to_datetime(daily_activity['start_date']) # Convert back to datetime for plotly
-
-    fig_daily = px.bar(
-        daily_activity,
-        x='start_date',
-        y='duration',
-        title='Total Presence Duration per Day',
-        labels={'start_date': 'Date', 'duration': 'Total Duration (seconds)'},
-        hover_data={'duration': ':.2f', 'start_date': True}
-    )
-    fig_daily.update_layout(xaxis_title='Date', yaxis_title='Total Duration (' + format_duration(daily_activity['duration'].max() or 0) + ')') # Custom Y-axis title
-
-    st.plotly_chart(fig_daily, use_container_width=True)
-
-
-    st.markdown("---") # Separator
-
-    # --- Session Table ---
-    st.header("Session Data Table")
-    # Select relevant columns and format duration for display
-    display_df = data_filtered[['start_time', 'end_time', 'duration']].copy()
-    display_df['start_time'] = display_df['start_time'].dt.strftime('%Y-%m-%d %H:%M:%S')
-    display_df['end_time'] = display_df['end_time'].dt.strftime('%Y-%m-%d %H:%M:%S')
-    display_df['duration_formatted'] = display_df['duration'].apply(format_duration)
-
-    st.dataframe(display_df[['start_time', 'end_time', 'duration_formatted']].rename(columns={
-        'start_time': 'Start Time',
-        'end_time': 'End Time',
-        'duration_formatted': 'Duration'
-    }), use_container_width=True)
-
-
-    # --- CSV Export ---
-    st.subheader("Export Data")
-    # Create a CSV string from the filtered DataFrame
-    csv_data = data_filtered[['start_time', 'end_time', 'duration']].to_csv(index=False).encode('utf-8')
-
-    st.download_button(
-        label="Download Session Data as CSV",
-        data=csv_data,
-        file_name=f"presence_sessions_{start_date_filter.strftime('%Y%m%d')}_to_{end_date_filter.strftime('%Y%m%d')}.csv",
-        mime='text/csv',
-    )
+    render_history(start_date_filter, end_date_filter)
 
 # --- How to Run Info ---
 st.sidebar.markdown("---")
@@ -0,0 +1,133 @@
+from ultralytics import YOLO
+import os
+import cv2
+import numpy as np
+import torch
+
+from app import MODEL_WEIGHTS, MODEL_ENGINE, MODEL_ONNX, MODEL_ONNX_INT8, DETECTION_BATCH_SIZE, INFER_IMGSZ
+
+# Input size the exported models are built for (must match what app.py feeds the model)
+EXPORT_IMGSZ = INFER_IMGSZ
+# Number of webcam frames used to calibrate INT8 activation ranges
+CALIBRATION_FRAMES = 200
+# Every Nth calibration frame is kept to check the quantized model still finds the person
+VALIDATION_FRAME_STRIDE = 10
+VALIDATION_CONF = 0.7 # Same confidence threshold as PresenceTrackerApp.detect_person
+# Share of the FP32 model's person detections the INT8 model must reproduce to be published
+INT8_MIN_RECALL_RATIO = 0.9
+# The quantized model is written here first and only renamed to MODEL_ONNX_INT8 once it passes validation
+MODEL_ONNX_INT8_UNVERIFIED = os.path.splitext(MODEL_ONNX_INT8)[0] + '_unverified.onnx'
+# Detect head of YOLOv8: its decode (Sigmoid/Mul/Concat...) mixes box coordinates (0..imgsz) with class
+# scores (0..1) in one tensor, which a single INT8 scale cannot represent; only its convolutions are quantized
+DETECT_HEAD_PREFIX = '/model.22/'
+
+
+class WebcamCalibrationReader:
+    # Feeds live webcam frames to onnxruntime's static quantizer (CalibrationDataReader protocol)
+    def __init__(self, input_name, num_frames=CALIBRATION_FRAMES):
+        self.input_name = input_name
+        self.num_frames = num_frames
+        self.frames_read = 0
+        self.validation_frames = [] # Resized BGR frames kept for validate_int8
+        self.camera = cv2.VideoCapture(0)
+
+    def get_next(self):
+        if self.frames_read >= self.num_frames or not self.camera.isOpened():
+            self.camera.release()
+            return None
+        ret, frame = self.camera.read()
+        if not ret:
+            self.camera.release()
+            return None
+        self.frames_read += 1
+        # Same preprocessing the model sees at inference: stretched to EXPORT_IMGSZ square, RGB, NCHW, float32 in [0, 1]
+        img = cv2.resize(frame, (EXPORT_IMGSZ, EXPORT_IMGSZ))
+        if self.frames_read % VALIDATION_FRAME_STRIDE == 0:
+            # Kept after the same stretch PresenceTrackerApp.prepare_input applies, so nothing gets letterboxed
+            self.validation_frames.append(img)
+        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        img = img.transpose(2, 0, 1)[np.newaxis].astype(np.float32) / 255.0
+        return {self.input_name: img}
+
+
+def count_person_frames(model_path, frames):
+    # Number of frames in which the model finds a person at the app's confidence threshold
+    model = YOLO(model_path, task='detect')
+    results = model.predict(frames, classes=0, conf=VALIDATION_CONF, imgsz=EXPORT_IMGSZ, verbose=False)
+    return sum(len(result.boxes) > 0 for result in results)
+
+
+def validate_int8(frames):
+    # The INT8 model must still see the person in nearly all of the frames where the FP32 model does
+    if not frames:
+        return False
+    fp32_hits = count_person_frames(MODEL_ONNX, frames)
+    if fp32_hits == 0:
+        print("Error: No person found in the calibration frames, so the INT8 model cannot be validated.")
+        return False
+    int8_hits = count_person_frames(MODEL_ONNX_INT8_UNVERIFIED, frames)
+    print(f"Person found in {int8_hits}/{len(frames)} frames with INT8 vs {fp32_hits}/{len(frames)} with FP32.")
+    return int8_hits >= INT8_MIN_RECALL_RATIO * fp32_hits
+
+
+def quantize_int8():
+    # Static INT8 quantization of the ONNX model for CPU-only machines
+    import onnx
+    import onnxruntime as ort
+    from onnxruntime.quantization import QuantFormat, QuantType, quantize_static
+
+    input_name = ort.InferenceSession(MODEL_ONNX, providers=['CPUExecutionProvider']).get_inputs()[0].name
+    reader = WebcamCalibrationReader(input_name)
+    if not reader.camera.isOpened():
+        print("Error: Could not open webcam. Skipping INT8 quantization.")
+        return
+
+    # Keep the Detect head's decode in float; its convolutions are still quantized
+    head_nodes = [node.name for node in onnx.load(MODEL_ONNX).graph.node
+                  if node.name.startswith(DETECT_HEAD_PREFIX) and node.op_type != 'Conv']
+
+    print(f"Calibrating INT8 model on {CALIBRATION_FRAMES} webcam frames. Sit in front of the camera...")
+    quantize_static(MODEL_ONNX, MODEL_ONNX_INT8_UNVERIFIED, reader,
+                    quant_format=QuantFormat.QDQ,
+                    per_channel=True,
+                    activation_type=QuantType.QUInt8,
+                    weight_type=QuantType.QInt8,
+                    nodes_to_exclude=head_nodes)
+
+    # app.py prefers the INT8 model whenever it exists, so only publish one that still detects people
+    if validate_int8(reader.validation_frames):
+        os.replace(MODEL_ONNX_INT8_UNVERIFIED, MODEL_ONNX_INT8)
+        print(f"INT8 ONNX model exported to '{MODEL_ONNX_INT8}'.")
+    else:
+        os.remove(MODEL_ONNX_INT8_UNVERIFIED)
+        print("Error: INT8 model failed validation and was discarded. The app will use the FP32 ONNX model.")
+
+
+def export_models():
+    # Run once after installing the requirements; app.py picks up whichever files exist
+    model = YOLO(MODEL_WEIGHTS)
+
+    if torch.cuda.is_available():
+        # TensorRT FP16 engine for NVIDIA GPUs (dynamic batch of 1 to DETECTION_BATCH_SIZE frames)
+        try:
+            model.export(format='engine', half=True, imgsz=EXPORT_IMGSZ, dynamic=True, batch=DETECTION_BATCH_SIZE)
+            print(f"TensorRT FP16 engine exported to '{MODEL_ENGINE}'.")
+        except Exception as e:
+            # Typically TensorRT is not installed (common on Windows); the ONNX export below still runs and
+            # overwrites the intermediate ONNX file the engine export leaves behind
+            print(f"Error: TensorRT export failed ({e}). Skipping the engine.")
+    else:
+        print("No CUDA device found. Skipping TensorRT export.")
+
+    # ONNX model for ONNX Runtime (CPU, or CUDA when the GPU execution provider is installed)
+    # Dynamic axes so the app can run single frames and batches with the same model
+    model.export(format='onnx', imgsz=EXPORT_IMGSZ, opset=13, dynamic=True)
+    print(f"ONNX model exported to '{MODEL_ONNX}'.")
+
+    if not torch.cuda.is_available():
+        # CPU-only machines benefit most from INT8 (VNNI / NEON dot-product kernels)
+        quantize_int8()
+
+
+if __name__ == "__main__":
+    export_models()